@@ -26,16 +26,14 @@ Options
 - kconfig_root_path: A string pointing to the project's root Kconfig file.
 """
 
-from distutils.command.build import build
-from itertools import chain
+from contextlib import ExitStack
+from glob import glob
 import json
-from operator import mod
+import multiprocessing
+from operator import itemgetter
 import os
 from pathlib import Path
-import re
-import sys
-from tempfile import TemporaryDirectory
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from docutils import nodes
 from sphinx.addnodes import pending_xref
@@ -48,6 +46,12 @@ from sphinx.roles import XRefRole
 from sphinx.util import progress_message
 from sphinx.util.docutils import SphinxDirective
 from sphinx.util.nodes import make_refnode
+from sphinx.util.parallel import parallel_available
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 __version__ = "0.1.0"
@@ -58,14 +62,57 @@ RESOURCES_DIR = Path(__file__).parent / "static"
 import kconfiglib
 
 
-def kconfig_load(app: Sphinx) -> kconfiglib.Kconfig:
-    """Load Kconfigs"""
-    wd = os.path.split(app.config.kconfig_root_path)[0]
-    prev = os.getcwd()
-    os.chdir(wd)
-    kc = kconfiglib.Kconfig(app.config.kconfig_root_path)
-    os.chdir(prev)
-    return kc
+def kconfig_srctree(app: Sphinx) -> str:
+    """Obtain the directory Kconfig sources are resolved against."""
+    wd = os.path.dirname(os.path.abspath(app.config.kconfig_root_path))
+    srctree = os.environ.get("srctree")
+    if not srctree:
+        return wd
+
+    return os.path.join(wd, srctree)
+
+
+def kconfig_load(
+    app: Sphinx,
+) -> Tuple[kconfiglib.Kconfig, Optional[Dict[str, List[str]]]]:
+    """Load Kconfigs
+
+    Also returns the files each source statement pattern expanded to, or None
+    if they could not be recorded.
+    """
+    path = os.path.abspath(app.config.kconfig_root_path)
+
+    # kconfiglib does not expose what source/osource/rsource patterns expanded
+    # to, so record the glob results while parsing. this allows detecting new
+    # files matching them (or missing optional ones appearing) later on.
+    iglob = getattr(kconfiglib, "iglob", None)
+    sources: Optional[Dict[str, List[str]]] = None
+    if iglob is not None:
+        sources = dict()
+
+        def record_iglob(pattern):
+            matches = sorted(iglob(pattern))
+            sources[pattern] = matches
+            return iter(matches)
+
+        kconfiglib.iglob = record_iglob
+
+    # kconfiglib resolves the root file and any sourced files relative to
+    # $srctree, so use it instead of changing the working directory. a user
+    # provided $srctree is honored, relative to the root Kconfig directory.
+    prev = os.environ.get("srctree")
+    os.environ["srctree"] = kconfig_srctree(app)
+    try:
+        return kconfiglib.Kconfig(path), sources
+    finally:
+        if prev is None:
+            del os.environ["srctree"]
+        else:
+            os.environ["srctree"] = prev
+
+        if iglob is not None:
+            kconfiglib.iglob = iglob
+
 
 class KconfigSearchNode(nodes.Element):
     @staticmethod
@@ -102,29 +149,12 @@ class KconfigSearch(SphinxDirective):
         # register all options to the domain at this point, so that they all
         # resolve to the page where the kconfig:search directive is inserted
         domain = self.env.get_domain("kconfig")
-        unique = set({option["name"] for option in self.env.kconfig_db})
-        for option in unique:
+        for option in self.env.kconfig_db_names:
             domain.add_option(option)
 
         return [KconfigSearchNode()]
 
 
-class _FindKconfigSearchDirectiveVisitor(nodes.NodeVisitor):
-    def __init__(self, document):
-        super().__init__(document)
-        self._found = False
-
-    def unknown_visit(self, node: nodes.Node) -> None:
-        if self._found:
-            return
-
-        self._found = isinstance(node, KconfigSearchNode)
-
-    @property
-    def found_kconfig_search_directive(self) -> bool:
-        return self._found
-
-
 class KconfigDomain(Domain):
     """Kconfig domain"""
 
@@ -133,14 +163,17 @@ class KconfigDomain(Domain):
     object_types = {"option": ObjType("option", "option")}
     roles = {"option": XRefRole()}
     directives = {"search": KconfigSearch}
-    initial_data: Dict[str, Any] = {"options": []}
+    data_version = 1
+    initial_data: Dict[str, Any] = {"options": [], "by_name": {}}
 
     def get_objects(self) -> Iterable[Tuple[str, str, str, str, str, int]]:
         for obj in self.data["options"]:
             yield obj
 
     def merge_domaindata(self, docnames: List[str], otherdata: Dict) -> None:
-        self.data["options"] += otherdata["options"]
+        self.data["options"].extend(otherdata["options"])
+        for option, entry in otherdata["by_name"].items():
+            self.data["by_name"].setdefault(option, entry)
 
     def resolve_xref(
         self,
@@ -152,14 +185,10 @@ class KconfigDomain(Domain):
         node: pending_xref,
         contnode: nodes.Element,
     ) -> Optional[nodes.Element]:
-        match = [
-            (docname, anchor)
-            for name, _, _, docname, anchor, _ in self.get_objects()
-            if name == target
-        ]
+        match = self.data["by_name"].get(target)
 
         if match:
-            todocname, anchor = match[0]
+            todocname, anchor = match
 
             return make_refnode(
                 builder, fromdocname, todocname, anchor, contnode, anchor
@@ -173,163 +202,399 @@ class KconfigDomain(Domain):
         self.data["options"].append(
             (option, option, "option", self.env.docname, option, -1)
         )
+        self.data["by_name"].setdefault(option, (self.env.docname, option))
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Serialize to UTF-8 encoded JSON, using orjson if available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+
+    return json.dumps(
+        obj, ensure_ascii=False, check_circular=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+_sc_fmt_cache: Dict[int, str] = {}
 
 
 def sc_fmt(sc):
+    # symbols are formatted many times (once per reference in expressions), so
+    # results are cached by object identity for the duration of the build
+    key = id(sc)
+    result = _sc_fmt_cache.get(key)
+    if result is not None:
+        return result
+
+    result = _sc_fmt(sc)
+    _sc_fmt_cache[key] = result
+    return result
+
+
+def _sc_fmt(sc):
     if isinstance(sc, kconfiglib.Symbol):
         if sc.nodes:
-            return f'<a href="#CONFIG_{sc.name}">CONFIG_{sc.name}</a>'
+            cfg = "CONFIG_" + sc.name
+            return '<a href="#' + cfg + '">' + cfg + "</a>"
     elif isinstance(sc, kconfiglib.Choice):
         if not sc.name:
             return "&ltchoice&gt"
-        return f'&ltchoice <a href="#CONFIG_{sc.name}">CONFIG_{sc.name}</a>&gt'
+        cfg = "CONFIG_" + sc.name
+        return '&ltchoice <a href="#' + cfg + '">' + cfg + "</a>&gt"
 
     return kconfiglib.standard_sc_expr_str(sc)
 
 
+def kconfig_sorted_syms(kconfig: kconfiglib.Kconfig) -> List[Any]:
+    """Obtain all named symbols and choices, sorted by name."""
+
+    # nameless symbols (e.g. choices without a name) are skipped
+    keyed = [(sc.name, sc) for sc in kconfig.unique_defined_syms if sc.name]
+    keyed.extend((sc.name, sc) for sc in kconfig.unique_choices if sc.name)
+    keyed.sort(key=itemgetter(0))
+
+    return [sc for _, sc in keyed]
+
+
+def kconfig_iter_options(
+    kconfig: kconfiglib.Kconfig, syms: Iterable[Any]
+) -> Iterator[Dict[str, Any]]:
+    """Generate the Kconfig database records, one per option menu node."""
+
+    # bind frequently used kconfiglib names locally, the loop below runs once
+    # per symbol and node
+    expr_str = kconfiglib.expr_str
+    split_expr = kconfiglib.split_expr
+    OR = kconfiglib.OR
+    AND = kconfiglib.AND
+    TYPE_TO_STR = kconfiglib.TYPE_TO_STR
+    Symbol = kconfiglib.Symbol
+    Choice = kconfiglib.Choice
+
+    # y/n constant symbols are shared by all symbols of the configuration
+    kc_y = kconfig.y
+    kc_n = kconfig.n
+
+    # format "value [if cond]" entries (defaults, selects, implies, ranges)
+    def fmt_cond(value, cond):
+        fmt = expr_str(value, sc_fmt)
+        if cond is kc_y:
+            return fmt
+        return f"{fmt} if {expr_str(cond, sc_fmt)}"
+
+    def fmt_range(min, max, cond):
+        fmt = f"[{expr_str(min, sc_fmt)}, {expr_str(max, sc_fmt)}]"
+        if cond is kc_y:
+            return fmt
+        return f"{fmt} if {expr_str(cond, sc_fmt)}"
+
+    for sc in syms:
+        # kconfiglib computes orig_defaults on every access, obtain them once
+        # for all nodes needed below (defconfig nodes and documented nodes)
+        node_defaults = [
+            (node, node.orig_defaults)
+            for node in sc.nodes
+            if node.prompt or node.help or "defconfig" in node.filename
+        ]
+
+        # store alternative defaults (from defconfig files)
+        alt_defaults = list()
+        for node, orig_defaults in node_defaults:
+            if "defconfig" not in node.filename:
+                continue
+
+            alt_defaults.extend(
+                [fmt_cond(value, cond), node.filename]
+                for value, cond in orig_defaults
+            )
+
+        # build list of symbols that select/imply the current one
+        # note: all reverse dependencies are ORed together, and conditionals
+        # (e.g. select/imply A if B) turns into A && B. So we first split
+        # by OR to include all entries, and we split each one by AND to just
+        # take the first entry.
+        selected_by = list()
+        if isinstance(sc, Symbol) and sc.rev_dep != kc_n:
+            for select in split_expr(sc.rev_dep, OR):
+                sym = split_expr(select, AND)[0]
+                selected_by.append(f"CONFIG_{sym.name}")
+
+        implied_by = list()
+        if isinstance(sc, Symbol) and sc.weak_rev_dep != kc_n:
+            for select in split_expr(sc.weak_rev_dep, OR):
+                sym = split_expr(select, AND)[0]
+                implied_by.append(f"CONFIG_{sym.name}")
+
+        # choices only depend on the symbol, shared by all of its nodes
+        choices = list()
+        if isinstance(sc, Choice):
+            choices = [expr_str(sym, sc_fmt) for sym in sc.syms]
+
+        # only process nodes with prompt or help
+        nodes = [
+            (node, orig_defaults)
+            for node, orig_defaults in node_defaults
+            if node.prompt or node.help
+        ]
+
+        inserted_paths = set()
+        for node, orig_defaults in nodes:
+            # avoid duplicate symbols by forcing unique paths. this can
+            # happen due to dependencies on 0, a trick used by some modules
+            path = f"{node.filename}:{node.linenr}"
+            if path in inserted_paths:
+                continue
+            inserted_paths.add(path)
+
+            dependencies = None
+            if node.dep is not kc_y:
+                dependencies = expr_str(node.dep, sc_fmt)
+
+            defaults = [fmt_cond(value, cond) for value, cond in orig_defaults]
+            selects = [fmt_cond(value, cond) for value, cond in node.orig_selects]
+            implies = [fmt_cond(value, cond) for value, cond in node.orig_implies]
+            ranges = [fmt_range(*range_) for range_ in node.orig_ranges]
+
+            menus = list()
+            iternode = node
+            while iternode.parent is not iternode.kconfig.top_node:
+                iternode = iternode.parent
+                if iternode.prompt:
+                    title = iternode.prompt[0]
+                else:
+                    title = kconfiglib.standard_sc_expr_str(iternode.item)
+                menus.append(title)
+
+            menus.append("(Top)")
+            menupath = " > ".join(reversed(menus))
+
+            filename = node.filename
+
+            yield {
+                "name": f"CONFIG_{sc.name}",
+                "prompt": node.prompt[0] if node.prompt else None,
+                "type": TYPE_TO_STR[sc.type],
+                "help": node.help,
+                "dependencies": dependencies,
+                "defaults": defaults,
+                "alt_defaults": alt_defaults,
+                "selects": selects,
+                "selected_by": selected_by,
+                "implies": implies,
+                "implied_by": implied_by,
+                "ranges": ranges,
+                "choices": choices,
+                "filename": filename,
+                "linenr": node.linenr,
+                "menupath": menupath,
+            }
+
+
+# number of symbols processed per database chunk
+KCONFIG_CHUNK_SIZE = 64
+
+# Kconfig instance and sorted symbols used by kconfig_build_chunk(). this is
+# module state so that forked workers inherit it instead of pickling it
+_kconfig_chunk_state: Optional[Tuple[kconfiglib.Kconfig, List[Any]]] = None
+
+
+def kconfig_build_chunk(bounds: Tuple[int, int]) -> Tuple[bytes, List[str]]:
+    """Build the database records for a range of the sorted symbols.
+
+    Returns the comma-separated JSON records and their unique option names.
+    """
+
+    if _kconfig_chunk_state is None:
+        raise RuntimeError(
+            "kconfig_build_chunk() called outside of kconfig_build_resources()"
+        )
+
+    kconfig, syms = _kconfig_chunk_state
+    start, end = bounds
+
+    records = list()
+    names = list()
+    for option in kconfig_iter_options(kconfig, syms[start:end]):
+        records.append(json_dumps(option))
+
+        name = option["name"]
+        if not names or names[-1] != name:
+            names.append(name)
+
+    return b",".join(records), names
+
+
+def kconfig_manifest(
+    kconfig: kconfiglib.Kconfig, root: str, sources: Dict[str, List[str]]
+) -> Dict[str, Any]:
+    """Obtain the inputs the Kconfig database is generated from.
+
+    This includes the extension version, the root Kconfig file, $srctree, the
+    modification time and size of all parsed Kconfig files, the files each
+    source statement expanded to and the values of the environment variables
+    referenced by the Kconfig files.
+    """
+
+    files = dict()
+    for filename in kconfig.kconfig_filenames:
+        path = os.path.abspath(os.path.join(kconfig.srctree, filename))
+        st = os.stat(path)
+        files[path] = [st.st_mtime_ns, st.st_size]
+
+    # $srctree is only set while loading and stored separately
+    env = {
+        var: os.environ.get(var) for var in kconfig.env_vars if var != "srctree"
+    }
+
+    return {
+        "version": __version__,
+        "root": root,
+        "srctree": kconfig.srctree,
+        "files": files,
+        "sources": sources,
+        "env": env,
+    }
+
+
+def kconfig_load_cached_names(
+    manifest_file: Path, kconfig_db_file: Path, root: str, srctree: str
+) -> Optional[List[str]]:
+    """Obtain option names from a previous build if its database is current.
+
+    Returns None if the database needs to be (re)generated.
+    """
+
+    if not kconfig_db_file.exists():
+        return None
+
+    try:
+        with open(manifest_file, "rb") as f:
+            cached = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+    # any unexpected manifest content is treated as outdated
+    try:
+        if (
+            cached["version"] != __version__
+            or cached["root"] != root
+            or cached["srctree"] != srctree
+        ):
+            return None
+
+        for var, value in cached["env"].items():
+            if os.environ.get(var) != value:
+                return None
+
+        for path, (mtime, size) in cached["files"].items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+
+            if st.st_mtime_ns != mtime or st.st_size != size:
+                return None
+
+        # new files matching a source pattern change the database too
+        for pattern, matches in cached["sources"].items():
+            if sorted(glob(pattern)) != matches:
+                return None
+
+        names = cached["names"]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        return None
+
+    return names
+
+
 def kconfig_build_resources(app: Sphinx) -> None:
     """Build the Kconfig database and install HTML resources."""
 
+    global _kconfig_chunk_state
+
     if not app.config.kconfig_generate_db:
         return
 
-    with progress_message("Building Kconfig database..."):
-        kconfig = kconfig_load(app)
-        db = list()
+    outdir = Path(app.outdir) / "kconfig"
+    outdir.mkdir(exist_ok=True)
 
-        for sc in sorted(
-            chain(kconfig.unique_defined_syms, kconfig.unique_choices),
-            key=lambda sc: sc.name if sc.name else "",
-        ):
-            # skip nameless symbols
-            if not sc.name:
-                continue
+    kconfig_db_file = outdir / "kconfig.json"
+    manifest_file = outdir / "kconfig.manifest.json"
+    root = os.path.abspath(app.config.kconfig_root_path)
 
-            # store alternative defaults (from defconfig files)
-            alt_defaults = list()
-            for node in sc.nodes:
-                if "defconfig" not in node.filename:
-                    continue
-
-                for value, cond in node.orig_defaults:
-                    fmt = kconfiglib.expr_str(value, sc_fmt)
-                    if cond is not sc.kconfig.y:
-                        fmt += f" if {kconfiglib.expr_str(cond, sc_fmt)}"
-                    alt_defaults.append([fmt, node.filename])
-
-            # build list of symbols that select/imply the current one
-            # note: all reverse dependencies are ORed together, and conditionals
-            # (e.g. select/imply A if B) turns into A && B. So we first split
-            # by OR to include all entries, and we split each one by AND to just
-            # take the first entry.
-            selected_by = list()
-            if isinstance(sc, kconfiglib.Symbol) and sc.rev_dep != sc.kconfig.n:
-                for select in kconfiglib.split_expr(sc.rev_dep, kconfiglib.OR):
-                    sym = kconfiglib.split_expr(select, kconfiglib.AND)[0]
-                    selected_by.append(f"CONFIG_{sym.name}")
-
-            implied_by = list()
-            if isinstance(sc, kconfiglib.Symbol) and sc.weak_rev_dep != sc.kconfig.n:
-                for select in kconfiglib.split_expr(sc.weak_rev_dep, kconfiglib.OR):
-                    sym = kconfiglib.split_expr(select, kconfiglib.AND)[0]
-                    implied_by.append(f"CONFIG_{sym.name}")
-
-            # only process nodes with prompt or help
-            nodes = [node for node in sc.nodes if node.prompt or node.help]
-
-            inserted_paths = list()
-            for node in nodes:
-                # avoid duplicate symbols by forcing unique paths. this can
-                # happen due to dependencies on 0, a trick used by some modules
-                path = f"{node.filename}:{node.linenr}"
-                if path in inserted_paths:
-                    continue
-                inserted_paths.append(path)
-
-                dependencies = None
-                if node.dep is not sc.kconfig.y:
-                    dependencies = kconfiglib.expr_str(node.dep, sc_fmt)
-
-                defaults = list()
-                for value, cond in node.orig_defaults:
-                    fmt = kconfiglib.expr_str(value, sc_fmt)
-                    if cond is not sc.kconfig.y:
-                        fmt += f" if {kconfiglib.expr_str(cond, sc_fmt)}"
-                    defaults.append(fmt)
-
-                selects = list()
-                for value, cond in node.orig_selects:
-                    fmt = kconfiglib.expr_str(value, sc_fmt)
-                    if cond is not sc.kconfig.y:
-                        fmt += f" if {kconfiglib.expr_str(cond, sc_fmt)}"
-                    selects.append(fmt)
-
-                implies = list()
-                for value, cond in node.orig_implies:
-                    fmt = kconfiglib.expr_str(value, sc_fmt)
-                    if cond is not sc.kconfig.y:
-                        fmt += f" if {kconfiglib.expr_str(cond, sc_fmt)}"
-                    implies.append(fmt)
-
-                ranges = list()
-                for min, max, cond in node.orig_ranges:
-                    fmt = (
-                        f"[{kconfiglib.expr_str(min, sc_fmt)}, "
-                        f"{kconfiglib.expr_str(max, sc_fmt)}]"
-                    )
-                    if cond is not sc.kconfig.y:
-                        fmt += f" if {kconfiglib.expr_str(cond, sc_fmt)}"
-                    ranges.append(fmt)
-
-                choices = list()
-                if isinstance(sc, kconfiglib.Choice):
-                    for sym in sc.syms:
-                        choices.append(kconfiglib.expr_str(sym, sc_fmt))
-
-                menupath = ""
-                iternode = node
-                while iternode.parent is not iternode.kconfig.top_node:
-                    iternode = iternode.parent
-                    if iternode.prompt:
-                        title = iternode.prompt[0]
+    # skip generation if no Kconfig file changed since the last build
+    names = kconfig_load_cached_names(
+        manifest_file, kconfig_db_file, root, kconfig_srctree(app)
+    )
+    if names is None:
+        # invalidate the previous build until the new database is complete
+        try:
+            manifest_file.unlink()
+        except FileNotFoundError:
+            pass
+
+        with progress_message("Building Kconfig database..."):
+            kconfig, sources = kconfig_load(app)
+            # obtained before generation, so that files modified while the
+            # database is built are detected by the next build. without the
+            # source expansions the database can not be reused safely.
+            manifest = None
+            if sources is not None:
+                manifest = kconfig_manifest(kconfig, root, sources)
+            syms = kconfig_sorted_syms(kconfig)
+            bounds = [
+                (start, start + KCONFIG_CHUNK_SIZE)
+                for start in range(0, len(syms), KCONFIG_CHUNK_SIZE)
+            ]
+            names = list()
+
+            # chunks are built in forked workers when running in parallel
+            # (kconfiglib objects can not be pickled efficiently), and streamed
+            # to the file as a JSON array in symbol order. only the unique
+            # option names are kept in memory for the search directive.
+            _kconfig_chunk_state = (kconfig, syms)
+            try:
+                with ExitStack() as stack:
+                    nproc = min(app.parallel, len(bounds))
+                    if nproc > 1 and parallel_available:
+                        pool = stack.enter_context(
+                            multiprocessing.get_context("fork").Pool(nproc)
+                        )
+                        chunks = pool.imap(kconfig_build_chunk, bounds)
                     else:
-                        title = kconfiglib.standard_sc_expr_str(iternode.item)
-                    menupath = f" > {title}" + menupath
-
-                menupath = "(Top)" + menupath
-
-                filename = node.filename
-
-                db.append(
-                    {
-                        "name": f"CONFIG_{sc.name}",
-                        "prompt": node.prompt[0] if node.prompt else None,
-                        "type": kconfiglib.TYPE_TO_STR[sc.type],
-                        "help": node.help,
-                        "dependencies": dependencies,
-                        "defaults": defaults,
-                        "alt_defaults": alt_defaults,
-                        "selects": selects,
-                        "selected_by": selected_by,
-                        "implies": implies,
-                        "implied_by": implied_by,
-                        "ranges": ranges,
-                        "choices": choices,
-                        "filename": filename,
-                        "linenr": node.linenr,
-                        "menupath": menupath,
-                    }
-                )
-
-        app.env.kconfig_db = db  # type: ignore
-
-        outdir = Path(app.outdir) / "kconfig"
-        outdir.mkdir(exist_ok=True)
-
-        kconfig_db_file = outdir / "kconfig.json"
-
-        with open(kconfig_db_file, "w") as f:
-            json.dump(db, f)
+                        chunks = map(kconfig_build_chunk, bounds)
+
+                    with open(kconfig_db_file, "wb", buffering=1 << 20) as f:
+                        f.write(b"[")
+                        first = True
+                        for records, chunk_names in chunks:
+                            if not records:
+                                continue
+
+                            if not first:
+                                f.write(b",")
+                            f.write(records)
+                            first = False
+
+                            if names and names[-1] == chunk_names[0]:
+                                chunk_names = chunk_names[1:]
+                            names.extend(chunk_names)
+                        f.write(b"]")
+            finally:
+                _kconfig_chunk_state = None
+                # cached entries are keyed by object id, which is only
+                # meaningful while this Kconfig instance is alive
+                _sc_fmt_cache.clear()
+
+            if manifest is not None:
+                manifest["names"] = names
+                with open(manifest_file, "wb") as f:
+                    f.write(json_dumps(manifest))
+
+    app.env.kconfig_db_names = names  # type: ignore
 
     app.config.html_extra_path.append(kconfig_db_file.as_posix())
     app.config.html_static_path.append(RESOURCES_DIR.as_posix())
@@ -350,9 +615,7 @@ def kconfig_install(
     ):
         return
 
-    visitor = _FindKconfigSearchDirectiveVisitor(doctree)
-    doctree.walk(visitor)
-    if visitor.found_kconfig_search_directive:
+    if doctree.next_node(KconfigSearchNode) is not None:
         app.add_css_file("kconfig.css")
         app.add_js_file("kconfig.js", type="module")
 